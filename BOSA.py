@@ -2,9 +2,10 @@
 #### 11/03/2024 José Carlos Guerra Copete - Arquimea Research Center ####
 
 import socket
+import contextlib
 import visa
 import logging
-import struct
+import numpy as np
 
 # create logger
 
@@ -38,6 +39,207 @@ if(len(log.handlers) == 0): # check if the logger already exists
 
     log.addHandler(ch)
 
+# SCPI suffixes selecting the window and the scale in the DISP commands
+
+_WIND = {True: ":WIND", False: ""}
+
+_SCAL = {True: ":SCAL", False: ""}
+
+# accepted argument values, checked on every setter call
+
+_ONOFF_TRUE = frozenset(("1", "ON", "TRUE"))
+
+_ONOFF_FALSE = frozenset(("0", "OFF", "FALSE"))
+
+_UNITS_WAV = frozenset(("NM", "PM", "GHZ", "THZ", ""))
+
+_UNITS_NM = frozenset(("NM", ""))
+
+_UNITS_POW = frozenset(("DBM", "MW", ""))
+
+_UNITS_DB = frozenset(("DB", ""))
+
+_TRACES = frozenset(("A", "B", "M1", "M2", "M3", "M4"))
+
+_MODES = frozenset(("MAIN", "BOSA", "TLS", "CA"))
+
+_STATES = frozenset(("HOLD", "RUN"))
+
+_SPACINGS = frozenset(("LOG", "LIN"))
+
+_AXES = frozenset(("WAV", "FREQ"))
+
+_BANDS_CL = frozenset(("C", "L", "CL", "C+L"))
+
+_BANDS_OCL = frozenset(("OC", "OL", "OCL", "CLO", "CO", "LO", "O+C+L", "C+L+O"))
+
+_GRAPHS = frozenset(("A", "B", "C"))
+
+_SWEEP_MODES = frozenset(("HR", "HS"))
+
+_AVG_COUNTS = frozenset(("4", "8", "12", "32", "CONT"))
+
+_SPAR_ILRL = frozenset(("ILRL", "IL+RL", "IR", "RLIL", "RL+IL", "RI", "IL&RL", "RL&IL"))
+
+_POLS = frozenset(("1+2", "1", "2", "1&2", "PDL", "MAX", "MIN", "SIMUL", "INDEP"))
+
+_MARK_MODES = frozenset(("TRCK", "FIXX", "FIXY"))
+
+_OSNR_MODES = frozenset(("PEAK", "BW"))
+
+_FTYPES = frozenset(("BDF", "TXT", "CSV", "JPG", "BMP", "GIF", "TIF"))
+
+_MEM_TRACES = frozenset(("M1", "M2", "M3", "M4"))
+
+# drops the spaces of band and S-parameter arguments ("C + L" -> "C+L")
+
+_NOSPACE = str.maketrans("", "", " ")
+
+# DISP:TRAC:Y queries for every (header, window, scale), built once at import
+
+_DISP_Y_QUERIES = {(header, window, scale): "DISP" + _WIND[window] + ":TRAC:Y" + _SCAL[scale] + ":" + header + "?"
+                   for header in ("BOTT", "PDIV", "RLEV", "NORM")
+                   for window in (False, True)
+                   for scale in (False, True)}
+
+def _flag(value, name):
+
+    """ boolean flag argument: True/False or 1/0, anything else is a TypeError """
+
+    if not isinstance(value, int): # bool is an int
+
+        raise TypeError("Value for %s must be boolean, instead it is %r" % (name, value))
+
+    return bool(value)
+
+def _normalize_onoff(on, name = "on"):
+
+    """ returns "1" or "0" for a 1/0, ON/OFF or boolean argument, anything else is a ValueError """
+
+    s = str(on).upper()
+
+    if s in _ONOFF_TRUE:
+
+        return "1"
+
+    if s in _ONOFF_FALSE:
+
+        return "0"
+
+    raise ValueError("Value for %s must be 1, 0, ON, OFF or a boolean, instead it is %r" % (name, on))
+
+def _norm_units(units, allowed, name = "units"):
+
+    """ returns units upper-cased ("" when omitted), anything not in allowed is a ValueError """
+
+    u = str(units or "").upper()
+
+    if u not in allowed:
+
+        raise ValueError("Value for %s must be %s, instead it is %r" % (name, " or ".join(sorted(a for a in allowed if a)), units))
+
+    return u
+
+def _out_bytes(out, msgLength):
+
+    """ byte view of a caller's trace array, which must be a C-contiguous (points, 2) float64 array of msgLength bytes """
+
+    if(out.dtype != np.float64 or out.ndim != 2 or out.shape[1] != 2 or not out.flags.c_contiguous or out.nbytes != msgLength):
+
+        raise ValueError("out must be a C-contiguous (%d, 2) float64 array, instead it is %s %r" % (msgLength // 16, out.dtype, out.shape))
+
+    return memoryview(out).cast("B")
+
+# getters that only send a query and return the reply: (method name, SCPI query),
+# attached to BOSA23095 after the class body
+
+_GETTERS = (
+    # Instrument identification commands
+    ("get_identificationNumber", "*IDN?"),
+    ("is_operationComplete", "*OPC?"),
+    # Display subsystem commands
+    ("get_graphSel", "DISP:COMP:GRAPHSEL ?"),
+    # SENSe subsystem commands
+    ("get_wavCenter", "SENS:WAV:CENT?"),
+    ("get_wavSingle", "SENS:WAV:SINGLE?"),
+    ("get_wavSweepCal", "SENS:WAV:SWEEPCAL?"),
+    ("get_wavSMode", "SENS:WAV:SMOD?"),
+    ("get_avgCount", "SENS:AVER:COUN?"),
+    ("get_avgState", "SENS:AVER:STAT?"),
+    ("get_avgCorr", "SENS:AVER:CORR?"),
+    ("get_avgCorrCen", "SENS:AVER:CORR:CENT?"),
+    ("get_avgCorrSpan", "SENS:AVER:CORR:SPAN?"),
+    ("get_laser", "SENS:SWITCH?"),
+    ("get_sweep", "SENS:SWEEP?"),
+    ("get_laserBand", "SENS:LAS ?"),
+    ("get_measBand", "SENS:BAND ?"),
+    # Input subsystem commands
+    ("get_inpSPar", "INP:SPAR?"),
+    ("get_inpPol", "INP:POL?"),
+    ("get_inpMueller", "INP:POL:MUELL?"),
+    ("get_inpPow", "INP:POW?"),
+    # Calculate subsystem commands
+    ("get_mrkState", "CALC:MARK:STAT?"),
+    ("get_mrkMode", "CALC:MARK:MOD?"),
+    ("get_mrkX", "CALC:MARK:X?"),
+    ("get_mrkY", "CALC:MARK:Y?"),
+    ("get_mrkThr", "CALC:MARK:THRE?"),
+    ("get_mrkRout", "CALC:MARK:READ?"),
+    ("get_mrkDXOff", "CALC:MARK:FUNC:DELT:X:OFFS?"),
+    ("get_mrkDXRef", "CALC:MARK:FUNC:DELT:X:REF?"),
+    ("get_mrkDYOff", "CALC:MARK:FUNC:DELT:Y:OFFS?"),
+    ("get_mrkDYRef", "CALC:MARK:FUNC:DELT:Y:REF?"),
+    ("get_mrkDPol", "CALC:MARK:FUNC:DELT:POL?"),
+    ("get_mrkDAng", "CALC:MARK:FUNC:DELT:ANG?"),
+    ("get_TPowUp", "CALC:TPOW:IRAN:UPP?"),
+    ("get_TPowLow", "CALC:TPOW:IRAN:LOW?"),
+    ("get_auxInPow", "CALC:AUXIN:POW?"),
+    ("get_OSNR", "CALC:OSNR:STAT?"),
+    ("get_OSNRval", "CALC:OSNR:VALUE?"),
+    ("get_OSNRdist", "CALC:OSNR:DIST?"),
+    ("get_OSNRNmode", "CALC:OSNR:NOISEPOWMODE?"),
+    ("get_OSNRNrefBW", "CALC:OSNR:NOISEREFBW?"),
+    ("get_OSNRSmode", "CALC:OSNR:SIGNALPOWMODE?"),
+    ("get_OSNRSrefBW", "CALC:OSNR:SIGNALBW?"),
+)
+
+# SENS:WAV:<header> value/unit settings: (method name suffix, SCPI header, changes the trace point count)
+
+_WAV_FIELDS = (("wavSmooth", "SMOOTH", False), ("wavSpan", "SPAN", True), ("wavSpeed", "SPEED", False),
+               ("wavStat", "STAT", False), ("wavStart", "STAR", True), ("wavStop", "STOP", True),
+               ("wavRes", "RES", True))
+
+def _getter(name, query):
+
+    """ builds a <name>() method returning the reply to query """
+
+    def getter(self):
+        return self.ask(query)
+
+    getter.__name__ = name
+    getter.__qualname__ = "BOSA23095." + name
+    getter.__doc__ = query
+
+    return getter
+
+def _wav_setter(name, header, resizes):
+
+    """ builds set_<name>(value, units), sending SENS:WAV:<header> <value> <units> """
+
+    prefix = "SENS:WAV:" + header + " "
+
+    def setter(self, value, units):
+        u = _norm_units(units, _UNITS_WAV)
+        if resizes:
+            self._trcount_cache.clear()
+        return self.ask(f"{prefix}{value} {u}")
+
+    setter.__name__ = "set_" + name
+    setter.__qualname__ = "BOSA23095.set_" + name
+    setter.__doc__ = prefix + "<value> <units>"
+
+    return setter
+
 class BOSA23095:
     """
     Basic library to send commands by SCPI
@@ -62,8 +264,18 @@ class BOSA23095:
 
     ask()
 
+    write_many()
+
+    ask_many()
+
+    bulk_write()
+
+    batch()
+
     ask_TRACE_REAL()
 
+    get_trace_binary()
+
     ask_TRACE_ASCII()
 
     read_TRACE_REAL()
@@ -78,10 +290,48 @@ class BOSA23095:
     <> are inputs,
     | are options. For boolean inputs, one can input 1, 0, "ON" or "OFF"
 
-    Getter commands (ending with ?) return the response
+    Getter commands (ending with ?) return the response; the ones that only send
+    their query are generated from the _GETTERS table
     Setter commands (with variable inputs) return 0 or an error
+
+    An invalid argument raises an error. For the choice arguments (modes, bands,
+    traces, formats, boolean data flags of the TRAC/FORM commands...) it is a
+    ValueError, and with BOSA23095.strict = False it is logged as a warning
+    instead and the setter returns None. Invalid on/off values and units always
+    raise ValueError, invalid window/scale/state flags always raise TypeError.
     
     """
+
+    # fixed attribute set: no per-instance __dict__, faster self.instrument & co. on the I/O path
+    __slots__ = ('interfaceType', 'location', 'portNo', 'activeTrace', 'instrument', 'modes',
+                 '_is_lan', '_rfile', '_trace_buf', '_trace_view',
+                 '_trcount_cache', '_mode_cache', '_mode_target', '_format',
+                 'ask', '_do_write', '_do_read', '_do_read_trace_real')
+
+    _rm = None # VISA ResourceManager shared by every GPIB instance
+
+    strict = True # invalid choice arguments raise ValueError, False only logs a warning (see _invalid)
+
+    @classmethod
+    def _resource_manager(cls):
+
+        """ returns the shared VISA ResourceManager, created on first use """
+
+        if(cls._rm is None):
+
+            cls._rm = visa.ResourceManager()
+
+        return cls._rm
+
+    def _invalid(self, message):
+
+        """ reports an invalid argument: ValueError if strict, otherwise a logged warning """
+
+        if(self.strict):
+
+            raise ValueError(message)
+
+        log.warning(message)
     
     def __init__(self, interfaceType, location, portNo = 10000, IDN=True, Reset = False):
         """create the BOSA object and tries to establish a connection with the equipment
@@ -102,6 +352,20 @@ class BOSA23095:
 
         self.activeTrace = None
 
+        self._trace_buf = None # LAN receive buffer of read_TRACE_REAL, kept between calls
+
+        self._trace_view = None # float64 array view of _trace_buf
+
+        self._trcount_cache = {} # get_trcount() replies, cleared when the sweep range changes
+
+        self._mode_cache = None # get_mode() reply once the mode is settled
+
+        self._mode_target = None # mode requested by set_mode(), until get_mode() reports it
+
+        self._format = None # FORM last sent through set_format(), None if unknown
+
+        self._is_lan = interfaceType.lower() == "lan"
+
         
         if(interfaceType.lower() == "lan"):
 
@@ -111,6 +375,8 @@ class BOSA23095:
 
                 self.connectLan()
 
+                self._rfile = self.instrument.makefile('rb', buffering=1048576)
+
             except Exception as e:
 
                 log.exception("Could not connect to BOSA device")
@@ -127,7 +393,9 @@ class BOSA23095:
 
             try:
              
-                 self.instrument = visa.ResourceManager().open_resource(location)
+                 self.instrument = self._resource_manager().open_resource(location)
+
+                 self.instrument.read_termination = '\n'
             except Exception as e:
 
                 log.exception("couldn't connect to device")
@@ -142,12 +410,34 @@ class BOSA23095:
 
         else:
 
-            log.error("Interface Type " + interfaceType + " not valid")
+            log.error("Interface Type %s not valid", interfaceType)
 
             raise Exception("interface type invalid")
 
             return
 
+        # resolve the interface once, ask(), write(), read() and read_TRACE_REAL() just call these
+
+        if(self._is_lan):
+
+            self.ask = self._ask_lan
+
+            self._do_write = self._write_lan
+
+            self._do_read = self._read_lan
+
+            self._do_read_trace_real = self._read_trace_real_lan
+
+        else:
+
+            self.ask = self._ask_gpib
+
+            self._do_write = self._write_gpib
+
+            self._do_read = self._read_gpib
+
+            self._do_read_trace_real = self._read_trace_real_gpib
+
         self.modes = ('MAIN', 'BOSA', 'TLS', 'CA')
 
         if(IDN):
@@ -203,17 +493,15 @@ class BOSA23095:
 
         try:
 
-            if(self.interfaceType.upper() == "LAN"):
-
-                self.instrument.close()
+            if(self._is_lan):
 
-            elif(self.interfaceType.upper() == "GPIB"):
+                self._rfile.close()
 
-                self.instrument.close()
+            self.instrument.close()
 
         except Exception as e:
 
-            log.warning("could not close interface correctly: exception %r", e.message)
+            log.warning("could not close interface correctly: exception %r", e)
 
     def connectLan(self):
 
@@ -225,6 +513,10 @@ class BOSA23095:
 
         self.instrument.settimeout(30)
 
+        self.instrument.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576) # room for a whole trace
+
+        self.instrument.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1048576)
+
         try:
 
             log.debug("Connecting to remote socket...")
@@ -239,7 +531,13 @@ class BOSA23095:
 
             raise e
 
-            
+        # send each short SCPI command at once and acknowledge replies without delay
+
+        self.instrument.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if hasattr(socket, "TCP_QUICKACK"): # Linux only
+
+            self.instrument.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
 
         log.debug("Connected to remote socket")
 
@@ -255,587 +553,664 @@ class BOSA23095:
 
         """
 
-        if(self.interfaceType.lower() == "lan"):
+        self._do_write(command)
 
-            log.debug("Sending command '" + command + "' using LAN interface...")
+    def _write_lan(self, command):
 
-            try:
+        log.debug("Sending command %r using LAN interface...", command)
 
-                self.instrument.sendall( (command + "\r\n").encode())
+        try:
 
-            except Exception as e:
+            self.instrument.sendall( (command + "\r\n").encode())
 
-                log.exception("Could not send data, command %r",command)
+        except Exception as e:
 
-                print(e)
+            log.exception("Could not send data, command %r",command)
 
-                raise e
+            print(e)
 
-        elif(self.interfaceType.lower() == "gpib"):
+            raise e
 
-            log.debug("Sending command '" + command + "' using GPIB interface...")
+    def _write_gpib(self, command):
 
-            try:
+        log.debug("Sending command %r using GPIB interface...", command)
 
-                self.instrument.write(command)
+        try:
 
-            except Exception as e:
+            self.instrument.write(command)
 
-                log.exception("Could not send data, command %r",command)
+        except Exception as e:
 
-                print(e)
+            log.exception("Could not send data, command %r",command)
 
-                raise e
+            print(e)
+
+            raise e
             
     def read(self):
 
         """ read something from device"""
 
-        message = ""
+        return self._do_read()
 
-        if(self.interfaceType.lower() == "lan"):
+    def _read_lan(self):
 
-            log.debug("Reading data using LAN interface...")
+        log.debug("Reading data using LAN interface...")
 
-            while(1):
+        try:
 
-                try:
-                    data = self.instrument.recv(115200)
-                    message += data.decode()
+            line = self._rfile.readline()
 
-                except Exception as e:
+        except Exception as e:
 
-                    log.exception("Could not read data")
+            log.exception("Could not read data")
 
-                    print(e)
+            print(e)
 
-                    raise e
+            raise e
 
-                if("\n" in message):
+        if(not line.endswith(b"\n")): # readline() only stops short at end of stream
 
-                    break
+            log.error("Connection closed before end of response: %r", line)
 
-            log.debug("All data readed!")
+            raise ConnectionError("connection closed while reading response")
 
-        elif(self.interfaceType.lower() == "gpib"):
+        message = line.decode()
 
-            log.debug("Reading data using GPIB interface...")
+        log.debug("All data readed!")
 
-            while(1):
+        log.debug("Data received: %s", message)
 
-                try:
+        return message
 
-                    message = self.instrument.read()
+    def _read_gpib(self):
 
-                    if(message!=''):
-                        break
-                
-                except Exception as e:
+        log.debug("Reading data using GPIB interface...")
+
+        try:
 
-                    log.exception("Could not read data")
+            # blocks until read_termination, set when the resource is opened
+
+            message = self.instrument.read()
+        
+        except Exception as e:
 
-                    print(e)
+            log.exception("Could not read data")
 
-                    raise e
+            print(e)
 
-#                if("\n" in message):
-#
-#                    break
+            raise e
 
-            log.debug("All data readed!")
+        log.debug("All data readed!")
 
-        log.debug("Data received: " + message)
+        log.debug("Data received: %s", message)
 
         return message
 
-    def ask(self, command):
+    # ask(command) writes a command and returns the response. It is bound in
+    # __init__ to one of the two methods below, which send and read in one go.
 
-        """ writes and reads data"""
+    def _ask_lan(self, command):
 
-        data = ""
+        log.debug("Sending command %r using LAN interface...", command)
 
-        self.write(command)
+        try:
 
-        data = self.read()
+            self.instrument.sendall( (command + "\r\n").encode())
 
-        return data
+            line = self._rfile.readline()
 
-    def ask_TRACE_REAL(self,interfaceType,NumPoints):
+        except Exception as e:
 
-        """ writes and reads data"""
-        
-        data = ""
+            log.exception("Could not query device, command %r",command)
 
-        self.write("TRAC?")
+            print(e)
 
-        data = self.read_TRACE_REAL(interfaceType,NumPoints)
+            raise e
 
-        return data
+        if(not line.endswith(b"\n")): # readline() only stops short at end of stream
+
+            log.error("Connection closed before end of response: %r", line)
+
+            raise ConnectionError("connection closed while reading response")
+
+        message = line.decode()
+
+        log.debug("Data received: %s", message)
+
+        return message
+
+    def _ask_gpib(self, command):
+
+        log.debug("Sending command %r using GPIB interface...", command)
+
+        try:
+
+            message = self.instrument.query(command)
+
+        except Exception as e:
+
+            log.exception("Could not query device, command %r",command)
+
+            print(e)
+
+            raise e
+
+        log.debug("Data received: %s", message)
+
+        return message
+
+    def write_many(self, commands):
+
+        """ write several commands to equipment in a single message
+
+            Parameters:
+
+                commands -> sequence of commands, joined with ; as a SCPI compound command
+
+        """
+
+        self.write(";".join(commands))
+
+    def ask_many(self, commands):
+
+        """ writes several commands in a single message and reads their responses
+
+            Every command answers with its own line, as with ask(), so one line
+            is read per command: the replies are returned as a list, in order.
+
+            Not checked on the BOSA yet: an instrument answering a compound
+            message once, or only its queries, as plain SCPI does, leaves this
+            waiting for the socket timeout.
+        """
+
+        self.write_many(commands)
+
+        return [self.read() for command in commands]
+
+    def bulk_write(self, *commands):
+
+        """ writes several commands in a single message followed by *OPC?
+
+            Returns the list of replies to the commands, read once the *OPC?
+            answer has come, that is once the instrument has executed all of them.
+            Relies on one reply per command, see ask_many().
+
+        """
+
+        return self.ask_many(commands + ("*OPC?",))[:-1]
+
+    @contextlib.contextmanager
+    def batch(self):
+
+        """ queue the commands sent through ask() and send them with bulk_write() on exit
+
+            Setters called inside the block return None. A query flushes the queue
+            together with itself, so commands keep their order. Relies on one
+            reply per command, see ask_many().
+
+                with bosa.batch():
+                    bosa.set_normY(0)
+                    bosa.autoscaleY()
+
+        """
+
+        pending = []
+
+        ask = self.ask
+
+        def queue(command):
+
+            if(command.rstrip().endswith("?")):
+
+                pending.append(command)
+
+                data = self.ask_many(pending)
+
+                del pending[:]
+
+                return data[-1] # the query's reply, the queued setters answered before it
+
+            pending.append(command)
+
+        self.ask = queue
+
+        try:
+
+            yield
+
+        finally:
+
+            self.ask = ask
+
+        if(len(pending) > 0):
+
+            self.bulk_write(*pending)
+
+    def ask_TRACE_REAL(self, NumPoints = None, out = None):
+
+        """ writes and reads data, see read_TRACE_REAL()"""
+
+        self.write("TRAC?")
+
+        return self._do_read_trace_real(NumPoints, out)
     
+    def get_trace_binary(self, NumPoints = None, out = None, block = False):
+
+        """ returns the trace as a (points, 2) float64 array, switching to FORM REAL if needed
+
+            The BOSA sends the trace without header: when NumPoints is omitted
+            it is taken from get_trcount(), cached until the sweep range changes.
+            block = True reads an IEEE 488.2 block sized from its own header
+            instead, see read_TRACE_REAL().
+        """
+
+        if(block):
+
+            NumPoints = None
+
+        elif(NumPoints is None):
+
+            if("" not in self._trcount_cache):
+
+                with self.format("ASCII"):
+
+                    self.get_trcount()
+
+            NumPoints = int(self._trcount_cache[""])
+
+        if(self._format != "REAL"):
+
+            self.set_format("REAL")
+
+        return self.ask_TRACE_REAL(NumPoints, out)
+
     def ask_TRACE_ASCII(self):
 
         """ writes and reads data"""
 
-#        data = ""
-        self.write("FORM ASCII")
-        data = ""
+        if(self._format != "ASCII"):
+
+            self.set_format("ASCII")
 
         self.write("TRAC?")
+
         data = self.read_TRACE_ASCII()
 
         return data
 
-    def read_TRACE_REAL(self,interfaceType,NumPoints):
+    def read_TRACE_REAL(self, NumPoints = None, out = None):
+
+        """ read a binary trace of NumPoints (wavelength, power) pairs from device
+
+            Bound in __init__ to the LAN or GPIB reader.
+
+            With NumPoints exactly NumPoints*16 bytes are read, without any
+            header. With NumPoints omitted the trace must come as an IEEE 488.2
+            definite length block (#<ndigits><length><data>) and is sized from
+            its header.
+
+            On LAN the returned array is a view of a buffer reused by the next
+            trace read: copy it (Trace.copy()) to keep it past that read.
+
+            out, a C-contiguous (points, 2) float64 array of the trace size,
+            is filled in place and returned instead, e.g.
+            read_TRACE_REAL(n, out=np.empty((n, 2))) for an array of its own.
+        """
+
+        return self._do_read_trace_real(NumPoints, out)
+
+    def _read_trace_real_lan(self, NumPoints = None, out = None):
+
+        log.debug("Reading data using LAN interface...")
+
+        # a headerless trace is raw doubles, its first byte may well be a "#":
+        # the header is only looked for when the caller does not give NumPoints
+        block = NumPoints is None
+
+        try:
+
+            if(block):
+
+                # IEEE 488.2 definite length block, #<ndigits><length> then the data
+                start = self._rfile.read(2)
+
+                if(start[:1] != b"#"):
+
+                    raise ValueError("NumPoints is needed for a trace sent without block header")
+
+                ndigits = int(start[1:])
+
+                if(ndigits == 0):
+
+                    raise ValueError("indefinite length block not supported")
+
+                msgLength = int(self._rfile.read(ndigits))
+
+        except Exception as e:
+
+            log.exception("Could not read block header")
+
+            print(e)
+
+            # the rest of the trace is still pending and there is no length to skip it:
+            # close the connection rather than let the next reply read trace bytes
+            self._rfile.close()
+
+            self.instrument.close()
+
+            raise ConnectionError("trace block header not understood, connection closed") from e
+
+        if(not block):
+
+            msgLength = int(NumPoints*2*8) # 8 Bytes (double) and 2 values, wavelength and power.
+
+        if(out is not None):
+
+            try:
+
+                buf = _out_bytes(out, msgLength)
+
+            except ValueError:
+
+                # drop the trace, so the next reply is read in sync
+                self._rfile.read(msgLength)
+
+                if(block):
+
+                    self._rfile.readline()
+
+                raise
+
+            view = out
+
+        else:
+
+            # receive straight into a buffer kept across calls, only reallocated when the length changes
+            if(self._trace_buf is None or len(self._trace_buf) != msgLength):
+
+                self._trace_buf = bytearray(msgLength)
+
+                # one row per point: column 0 is the wavelength, column 1 the power
+                self._trace_view = np.frombuffer(self._trace_buf, dtype=np.float64).reshape(-1, 2)
+
+            buf = self._trace_buf
+
+            view = self._trace_view
+
+        try:
+            # readinto() only returns early at end of stream, like recv with MSG_WAITALL
+            read_length = self._rfile.readinto(buf)
+
+        except Exception as e:
+
+            log.exception("Could not read data")
+
+            print(e)
+
+            raise e
+
+        if(read_length != msgLength):
+
+            log.error("Connection closed after %d of %d bytes", read_length, msgLength)
+
+            raise ConnectionError("connection closed while reading trace")
+
+        if(block):
+
+            self._rfile.readline() # response terminator after the block
+
+        return view
+
+    def _read_trace_real_gpib(self, NumPoints = None, out = None):
+
+        log.debug("Reading data using GPIB interface...")
+
+        if(NumPoints is None):
+
+            # VISA parses the IEEE 488.2 header and unpacks the doubles in one call
+            try:
+
+                Trace = self.instrument.read_binary_values(datatype='d', is_big_endian=False, container=np.array, header_fmt='ieee')
+
+            except Exception as e:
+
+                log.exception("Could not read data")
+
+                print(e)
+
+                raise e
+
+            if(out is not None):
+
+                _out_bytes(out, Trace.nbytes)
+
+                out.reshape(-1)[:] = Trace
+
+                return out
+
+            # one row per point: column 0 is the wavelength, column 1 the power
+            return Trace.reshape(-1, 2)
+
+        msgLength = int(NumPoints*2*8) # 8 Bytes (double) and 2 values, wavelength and power.
+
+        if(out is not None):
+
+            _out_bytes(out, msgLength) # checked before reading, not to leave the rest of the trace pending
+
+        try:
+
+            response_byte_array = self.instrument.read_bytes(msgLength, chunk_size=None, break_on_termchar=False)
+
+        except Exception as e:
 
-        """ read something from device"""
+            log.exception("Could not read data")
 
-        response_byte_array=b''
-        msgLength = int(NumPoints*2*8) # 8 Bytes (double) and 2 values, wavelength and power.
+            print(e)
 
-        log.debug("Reading data using LAN interface...")
+            raise e
 
+        # one row per point: column 0 is the wavelength, column 1 the power
+        Trace = np.frombuffer(response_byte_array, dtype=np.float64, count=2*int(NumPoints)).reshape(int(NumPoints), 2)
 
-        if(self.interfaceType.lower() == "lan"):
+        if(out is not None):
 
-            while(1):
-    
-                try:
-                    if (msgLength<19200):
-                        Byte_data = self.instrument.recv(msgLength)
-                    else:
-                        Byte_data = self.instrument.recv(19200)
-    
-                    response_byte_array= b''.join([response_byte_array, Byte_data])
-                    read_length=len(Byte_data)
-                    msgLength=msgLength-read_length
-    
-                except Exception as e:
-    
-                    log.exception("Could not read data")
-    
-                    print(e)
-    
-                    raise e
-    
-                if(msgLength==0):
-                    break
-         
-        elif(self.interfaceType.lower() == "gpib"):
+            out[...] = Trace
 
-            while(1):
-    
-                try:
-                    response_byte_array = self.instrument.read_bytes(msgLength, chunk_size=None, break_on_termchar=False)
-                
-                    if((response_byte_array != '')):
-                        break
-                    
-                except Exception as e:
-    
-                    log.exception("Could not read data")
-    
-                    print(e)
-    
-                    raise e
-        
-        c, r = 2, int(NumPoints)
-        Trace= [[0 for x in range(c)] for x in range(r)]
-        for x in range(0,int(NumPoints)):
-            Trace[x][0]=struct.unpack('d', response_byte_array[(x)*16:(x)*16+8])
-            Trace[x][1] = struct.unpack('d', response_byte_array[(x) * 16+8:(x+1) * 16 ])
+            return out
 
         return Trace
 
     def read_TRACE_ASCII(self):
 
         """ read something from device"""
-        log.debug("Reading data using GPIB interface...")
 
-        while(1):
+        if(self._is_lan):
 
-            try:
-                
-                Byte_data = self.instrument.read_ascii_values(converter='f', separator=',', container=list,delay=None)
-            
-                if((Byte_data != '')):
-                    break
-                
-            except Exception as e:
+            return [float(x) for x in self._read_lan().split(',')]
 
-                log.exception("Could not read data")
+        log.debug("Reading data using GPIB interface...")
 
-                print(e)
+        try:
+            
+            Byte_data = self.instrument.read_ascii_values(converter='f', separator=',', container=list,delay=None)
+            
+        except Exception as e:
 
-                raise e
+            log.exception("Could not read data")
 
-        return Byte_data
+            print(e)
 
-#   Instrument identification commands
-        
-    def get_identificationNumber(self):
-        if self.available:
-            return self.ask('*IDN?')
-        else:
-            print("Connect to device first.")
+            raise e
 
-    def is_operationComplete(self):
-        if self.available:
-            return self.ask('*OPC?')
-        else:
-            print("Connect to device first")
+        return Byte_data
 
 #   Instrument subsystem commands
 
     def get_mode(self):
-        return self.ask("INST:STAT:MODE ?")
+        # cached once the mode is settled: no mode change pending, or the one
+        # requested by set_mode() reached, so polling after set_mode() still queries
+        if(self._mode_cache is not None):
+            return self._mode_cache
+        mode = self.ask("INST:STAT:MODE ?")
+        if(self._mode_target is None or mode.strip() == self._mode_target):
+            self._mode_cache = mode
+            self._mode_target = None
+        return mode
     
     def set_mode(self, mode):
-        if mode.upper() in self.modes:
-            return self.ask("INST:STAT:MODE " + mode.upper())
+        if mode.upper() in _MODES:
+            self._mode_cache = None
+            self._mode_target = mode.upper()
+            self._trcount_cache.clear()
+            return self.ask(f"INST:STAT:MODE {mode.upper()}")
         else:
-            print("Mode selected " + mode + " is not valid")
+            return self._invalid(f"Mode selected {mode!r} is not valid")
 
     def get_state(self, meas_state):
-        if meas_state.upper() in ('HOLD', 'RUN'):
-            return self.ask("INST:STAT:" + meas_state + " ?")
+        if meas_state.upper() in _STATES:
+            return self.ask(f"INST:STAT:{meas_state} ?")
         else:
-            print("Measurement state " + meas_state + " not valid")
+            return self._invalid(f"Measurement state {meas_state!r} not valid")
 
     def set_state(self, meas_state, on):
-        if meas_state.upper() in ('HOLD', 'RUN') and on in (1,0,"1","0", True, False):
-            if on == True:
-                on = 1
-            elif on == False:
-                on = 0
-            return self.ask("INST:STAT:" + meas_state + " " + str(on))
+        if meas_state.upper() in _STATES:
+            return self.ask(f"INST:STAT:{meas_state} {_normalize_onoff(on)}")
         else:
-            print("Measurement state " + meas_state + " or state " + on + " not valid")
+            return self._invalid(f"Measurement state {meas_state!r} not valid")
 
 #   Display subsystem commands
 
+    def _ws(self, window, scale = False):
+
+        """ returns the window and scale suffixes of the DISP commands """
+
+        return _WIND[_flag(window, "window")], _SCAL[_flag(scale, "scale")]
+
+    def _disp_y_query(self, header, window, scale):
+
+        """ returns the precomputed DISP[:WIND]:TRAC:Y[:SCAL]:<header>? query """
+
+        return _DISP_Y_QUERIES[header, _flag(window, "window"), _flag(scale, "scale")]
+
     def autoscaleY(self, window = False, scale = False, once = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-            return
-        if once == True:
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":AUTO ONCE")
-        elif once == False:
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":AUTO")
+        wind, scal = self._ws(window, scale)
+        if _flag(once, "once"):
+            return self.ask(f"DISP{wind}:TRAC:Y{scal}:AUTO ONCE")
         else:
-            print("Value for once must be boolean, instead it is " + once)
+            return self.ask(f"DISP{wind}:TRAC:Y{scal}:AUTO")
 
     def set_bottomY(self, value, magnitude, window = False, scale = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-        if str(magnitude or "").upper() in ("DBM", "MW", ""):
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":BOTT " + value + str(magnitude or "").upper())
-        else:
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":BOTT " + value)
+        wind, scal = self._ws(window, scale)
+        mag = _norm_units(magnitude, _UNITS_POW, "magnitude")
+        return self.ask(f"DISP{wind}:TRAC:Y{scal}:BOTT {value}{mag}")
 
     def get_bottomY(self, window, scale):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-            return
-        return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":BOTT?")
+        return self.ask(self._disp_y_query("BOTT", window, scale))
     
     def set_powresY(self, value, magnitude, window = False, scale = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-        if str(magnitude or "").upper() in ("DBM", "MW"):
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":PDIV " + value + str(magnitude or "").upper())
-            
-        else:
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":PDIV " + value)
+        wind, scal = self._ws(window, scale)
+        mag = _norm_units(magnitude, _UNITS_POW, "magnitude")
+        return self.ask(f"DISP{wind}:TRAC:Y{scal}:PDIV {value}{mag}")
                    
     def get_powresY(self, window = False, scale = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-            return
-        return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":PDIV?")
+        return self.ask(self._disp_y_query("PDIV", window, scale))
         
     def set_refY(self, value, magnitude, window = False, scale = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-        if str(magnitude or "").upper() in ("DBM", "MW", ""):
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":RLEV " + value + str(magnitude or "").upper())
-            
-        else:
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":RLEV " + value)
+        wind, scal = self._ws(window, scale)
+        mag = _norm_units(magnitude, _UNITS_POW, "magnitude")
+        return self.ask(f"DISP{wind}:TRAC:Y{scal}:RLEV {value}{mag}")
                    
     def get_refY(self, window = False, scale = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-            return
-        return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":RLEV?")
+        return self.ask(self._disp_y_query("RLEV", window, scale))
         
     def set_normY(self, on, window = False, scale = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":NORM " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":NORM 1")
-                
-            elif on == False:
-                return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":NORM 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        wind, scal = self._ws(window, scale)
+        return self.ask(f"DISP{wind}:TRAC:Y{scal}:NORM {_normalize_onoff(on)}")
 
     def get_normY(self, window = False, scale = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if scale == True:
-            scal = ":SCAL"
-        elif scale == False:
-            scal = ""
-        else: 
-            print("Value for scale must be boolean, instead it is " + scale)
-            return
-        return self.ask("DISP" + wind + ":TRAC:Y" + scal + ":NORM?")
+        return self.ask(self._disp_y_query("NORM", window, scale))
         
     def set_spacY(self, scale, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if str(scale).upper() in ("LOG", "LIN"):
-            return self.ask("DISP" + wind + ":TRAC:Y:SPAC " + str(scale).upper())
+        wind, _ = self._ws(window)
+        s = str(scale).upper()
+        if s in _SPACINGS:
+            return self.ask(f"DISP{wind}:TRAC:Y:SPAC {s}")
             
         else:
-            print("Value for scale must be LIN or LOG, instead it is: " + scale)
+            return self._invalid(f"Value for scale must be LIN or LOG, instead it is: {scale!r}")
 
     def get_spacY(self, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        return self.ask("DISP" + wind + ":TRAC:Y:SPAC?")
+        wind, _ = self._ws(window)
+        return self.ask(f"DISP{wind}:TRAC:Y:SPAC?")
         
     def set_unitsX(self, units, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if str(units).upper() in ("WAV", "FREQ"):
-            return self.ask("DISP" + wind + ":TRAC:X " + str(units).upper())
+        wind, _ = self._ws(window)
+        u = str(units).upper()
+        if u in _AXES:
+            return self.ask(f"DISP{wind}:TRAC:X {u}")
             
         else:
-            print("Value for units must be WAV or FREQ, instead it is: " + units)
+            return self._invalid(f"Value for units must be WAV or FREQ, instead it is: {units!r}")
 
     def get_unitsX(self, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        return self.ask("DISP" + wind + ":TRAC:X?")
+        wind, _ = self._ws(window)
+        return self.ask(f"DISP{wind}:TRAC:X?")
         
     def set_trace(self, trace, on, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if str(trace).upper() in ("A","B","M1", "M2", "M3", "M4"):
-            if str(on).upper() in ("ON", "OFF"):
-                return self.ask("DISP" + wind + ":TRAC:STAT " + str(trace).upper() + " " + str(on).upper())
-                
-            elif on in (True, 1, "1"):
-                return self.ask("DISP" + wind + ":TRAC:STAT " + str(trace).upper() + " 1")
-                
-            elif on in (False, 0, "0"):
-                return self.ask("DISP" + wind + ":TRAC:STAT " + str(trace).upper() + " 0")
-                
-            else:
-                print("Value for on must be ON or OFF, instead it is " + str(on).upper())
+        wind, _ = self._ws(window)
+        t = str(trace).upper()
+        if t in _TRACES:
+            return self.ask(f"DISP{wind}:TRAC:STAT {t} {_normalize_onoff(on)}")
         else:
-            print("Value for trace must be M1 to M4, instead it is: " + str(trace).upper())
+            return self._invalid(f"Value for trace must be M1 to M4, instead it is: {str(trace).upper()!r}")
 
-    def get_trace(self, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        return self.ask("DISP" + wind + ":TRAC:STAT?")
+    def get_traceStat(self, window = False):
+        wind, _ = self._ws(window)
+        return self.ask(f"DISP{wind}:TRAC:STAT?")
         
     def set_graphBand(self, band, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if str(band).upper().replace(" ", "") in ("C", "L", "CL", "C+L"):
-            return self.ask("DISP" + wind + ":GRAPHICSEL C+L")
+        wind, _ = self._ws(window)
+        b = str(band).upper().translate(_NOSPACE)
+        if b in _BANDS_CL:
+            return self.ask(f"DISP{wind}:GRAPHICSEL C+L")
             
-        elif str(band).upper() == "O":
-            return self.ask("DISP" + wind + ":GRAPHICSEL O")
+        elif b == "O":
+            return self.ask(f"DISP{wind}:GRAPHICSEL O")
             
         else:
-            print("Value for band must be CL or O")
+            return self._invalid("Value for band must be CL or O")
 
     def get_graphBand(self, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        return self.ask("DISP" + wind + ":GRAPHSEL ?")
+        wind, _ = self._ws(window)
+        return self.ask(f"DISP{wind}:GRAPHSEL ?")
         
     def set_graphView(self, band, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        if str(band).upper().replace(" ", "") in ("C", "L", "CL", "C+L"):
-            return self.ask("DISP" + wind + ":GRAPHICVIEW C+L")
+        wind, _ = self._ws(window)
+        b = str(band).upper().translate(_NOSPACE)
+        if b in _BANDS_CL:
+            return self.ask(f"DISP{wind}:GRAPHICVIEW C+L")
             
-        elif str(band).upper() == "O":
-            return self.ask("DISP" + wind + ":GRAPHICVIEW O")
+        elif b == "O":
+            return self.ask(f"DISP{wind}:GRAPHICVIEW O")
             
-        elif str(band).upper().replace(" ", "") in ("OC", "OL", "OCL", "CLO", "CO", "LO", "O+C+L", "C+L+O"):
-            return self.ask("DISP" + wind + ":GRAPHICVIEW O+C+L")
+        elif b in _BANDS_OCL:
+            return self.ask(f"DISP{wind}:GRAPHICVIEW O+C+L")
             
         else:
-            print("Value for band must be CL, O or OCL")
+            return self._invalid("Value for band must be CL, O or OCL")
 
     def get_graphView(self, window = False):
-        if window == True:
-            wind = ":WIND"
-        elif window == False:
-            wind = ""
-        else: 
-            print("Value for window must be boolean, instead it is " + window)
-            return
-        return self.ask("DISP" + wind + ":GRAPHICVIEW ?")
+        wind, _ = self._ws(window)
+        return self.ask(f"DISP{wind}:GRAPHICVIEW ?")
         
     def set_grapSel(self, act):
-        if str(act).upper() in ("A", "B", "C"):
-            return self.ask("DISP:COMP:GRAPHICSEL " + str(act).upper())
+        a = str(act).upper()
+        if a in _GRAPHS:
+            return self.ask(f"DISP:COMP:GRAPHICSEL {a}")
         else:
-            print("Value for act must be A, B or C, instead it is " + act)
+            return self._invalid(f"Value for act must be A, B or C, instead it is {act!r}")
 
-    def get_graphSel(self):
-        return self.ask("DISP:COMP:GRAPHSEL ?")
-        
 #   SENSe subsystem commands
     
     def set_wavCenter(self, units, value = "MAX"):
@@ -843,341 +1218,125 @@ class BOSA23095:
             return self.ask("SENS:WAV:CENT MAX")
             
         else:
-            if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-                return self.ask("SENS:WAV:CENT " + value + " " + str(units or "").upper())
-                
-            else:
-                print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
+            return self.ask(f"SENS:WAV:CENT {value} {_norm_units(units, _UNITS_WAV)}")
 
-    def get_wavCenter(self):
-        return self.ask("SENS:WAV:CENT?")
+#   set_/get_ wavSmooth, wavSpan, wavSpeed, wavStat, wavStart, wavStop and wavRes
+#   are generated from _WAV_FIELDS after the class
         
     def set_wavSingle(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("SENS:WAV:SINGLE " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("SENS:WAV:SINGLE 1")
-                
-            elif on == False:
-                return self.ask("SENS:WAV:SINGLE 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
-
-    def get_wavSingle(self):
-        return self.ask("SENS:WAV:SINGLE?")
-        
-    def set_wavSmooth(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("SENS:WAV:CENT " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
-
-    def get_wavSmooth(self):
-        return self.ask("SENS:WAV:SMOOTH?")
-        
-    def set_wavSpan(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("SENS:WAV:SPAN " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
-
-    def get_wavSpan(self):
-        return self.ask("SENS:WAV:SPAN?")
-        
-    def set_wavSpeed(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("SENS:WAV:SPEED " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
+        return self.ask(f"SENS:WAV:SINGLE {_normalize_onoff(on)}")
 
-    def get_wavSpeed(self):
-        return self.ask("SENS:WAV:SPEED?")
-        
     def set_wavSweepCal(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("SENS:WAV:SWEEPCAL " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("SENS:WAV:SWEEPCAL 1")
-                
-            elif on == False:
-                return self.ask("SENS:WAV:SWEEPCAL 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
-
-    def get_wavSweepCal(self):
-        return self.ask("SENS:WAV:SWEEPCAL?")
-        
-    def set_wavStat(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("SENS:WAV:STAT " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
-
-    def get_wavStat(self):
-        return self.ask("SENS:WAV:STAT?")
-        
-    def set_wavStart(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("SENS:WAV:STAR " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
-
-    def get_wavStart(self):
-        return self.ask("SENS:WAV:STAR?")
-        
-    def set_wavStop(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("SENS:WAV:STOP " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
-
-    def get_wavStop(self):
-        return self.ask("SENS:WAV:STOP?")
-        
-    def set_wavRes(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("SENS:WAV:RES " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
+        return self.ask(f"SENS:WAV:SWEEPCAL {_normalize_onoff(on)}")
 
-    def get_wavRes(self):
-        return self.ask("SENS:WAV:RES?")
-        
     def set_wavSMode(self, mode):
-        if str(mode).upper() in ("HR", "HS"):
-            return self.ask("SENS:WAV:SMOD " + str(mode).upper())
+        m = str(mode).upper()
+        if m in _SWEEP_MODES:
+            return self.ask(f"SENS:WAV:SMOD {m}")
             
         else:
-            print("Value for mode must be HR or HS, instead it is " + mode)
+            return self._invalid(f"Value for mode must be HR or HS, instead it is {mode!r}")
 
-    def get_wavSMode(self):
-        return self.ask("SENS:WAV:SMOD?")
-        
     def set_avgCount(self, number = "CONT"):
-        if str(number).upper() in ("4", "8", "12", "32", "CONT"):
-            return self.ask("SENS:AVER:COUN " + str(number).upper())
+        n = str(number).upper()
+        if n in _AVG_COUNTS:
+            return self.ask(f"SENS:AVER:COUN {n}")
             
         else:
-            print("Value for number must be 4, 8, 12, 32 or CONT , instead it is " + number)
+            return self._invalid(f"Value for number must be 4, 8, 12, 32 or CONT, instead it is {number!r}")
 
-    def get_avgCount(self):
-        return self.ask("SENS:AVER:COUN?")
-        
     def set_avgState(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("SENS:AVER:STAT " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("SENS:AVER:STAT 1")
-                
-            elif on == False:
-                return self.ask("SENS:AVER:STAT 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        return self.ask(f"SENS:AVER:STAT {_normalize_onoff(on)}")
 
-    def get_avgState(self):
-        return self.ask("SENS:AVER:STAT?")
-          
     def set_avgCorr(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("SENS:AVER:CORR " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("SENS:AVER:CORR 1")
-                
-            elif on == False:
-                return self.ask("SENS:AVER:CORR 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        return self.ask(f"SENS:AVER:CORR {_normalize_onoff(on)}")
 
-    def get_avgCorr(self):
-        return self.ask("SENS:AVER:CORR?")
-        
     def set_avgCorrCen(self, value, units):
-        if str(units or "").upper() in ("NM", ""):
-            return self.ask("SENS:AVER:CORR:CENT " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, instead it is " + units)
+        return self.ask(f"SENS:AVER:CORR:CENT {value} {_norm_units(units, _UNITS_NM)}")
 
-    def get_avgCorrCen(self):
-        return self.ask("SENS:AVER:CORR:CENT?")
-        
     def set_avgCorrSpan(self, value, units):
-        if str(units or "").upper() in ("NM", ""):
-            return self.ask("SENS:AVER:CORR:SPAN " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, instead it is " + units)
+        return self.ask(f"SENS:AVER:CORR:SPAN {value} {_norm_units(units, _UNITS_NM)}")
 
-    def get_avgCorrSpan(self):
-        return self.ask("SENS:AVER:CORR:SPAN?")
-        
     def noiseZero(self):
         return self.ask("SENS:NOIS")
         
     def set_laser(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("SENS:SWITCH " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("SENS:SWITCH 1")
-                
-            elif on == False:
-                return self.ask("SENS:SWITCH 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        return self.ask(f"SENS:SWITCH {_normalize_onoff(on)}")
 
-    def get_laser(self):
-        return self.ask("SENS:SWITCH?")
-        
     def set_sweep(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("SENS:SWEEP " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("SENS:SWEEP 1")
-                
-            elif on == False:
-                return self.ask("SENS:SWEEP 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        return self.ask(f"SENS:SWEEP {_normalize_onoff(on)}")
 
-    def get_sweep(self):
-        return self.ask("SENS:SWEEP?")
-        
     def set_laserBand(self, band):
-        if str(band).upper().replace(" ", "") in ("C", "L", "CL", "C+L"):
+        b = str(band).upper().translate(_NOSPACE)
+        if b in _BANDS_CL:
             return self.ask("SENS:LAS C+L")
             
-        elif str(band).upper() == "O":
+        elif b == "O":
             return self.ask("SENS:LAS O")
             
         else:
-            print("Value for band must be CL or O, instead it is " + band)
+            return self._invalid(f"Value for band must be CL or O, instead it is {band!r}")
 
-    def get_laserBand(self):
-        return self.ask("SENS:LAS ?")
-        
     def set_measBand(self, band):
-        if str(band).upper().replace(" ", "") in ("C", "L", "CL", "C+L"):
+        self._trcount_cache.clear()
+        b = str(band).upper().translate(_NOSPACE)
+        if b in _BANDS_CL:
             return self.ask("SENS:BAND C+L")
             
-        elif str(band).upper() == "O":
+        elif b == "O":
             return self.ask("SENS:BAND O")
             
-        elif str(band).upper().replace(" ", "") in ("OC", "OL", "OCL", "CLO", "CO", "LO", "O+C+L", "C+L+O"):
+        elif b in _BANDS_OCL:
             return self.ask("SENS:BAND O+C+L")
             
         else:
-            print("Value for band must be CL, O or OCL, instead it is "+ band)
+            return self._invalid(f"Value for band must be CL, O or OCL, instead it is {band!r}")
 
-    def get_measBand(self):
-        return self.ask("SENS:BAND ?")
-        
 #   Input subsystem commands
 
     def set_inpSPar(self, meas):
-        if str(meas).upper() == "IL":
+        m = str(meas).upper().translate(_NOSPACE)
+        if m == "IL":
             return self.ask("INP:SPAR IL")
             
-        elif str(meas).upper() == "RL":
+        elif m == "RL":
             return self.ask("INP:SPAR RL")
             
-        elif str(meas).upper().replace(" ", "") in ("ILRL", "IL+RL", "IR", "RLIL", "RL+IL", "RI", "IL&RL", "RL&IL"):
+        elif m in _SPAR_ILRL:
             return self.ask("INP:SPAR IL&RL")
             
         else:
-            print("Value for meas must be IL, RL or IL&RL, instead it is " + meas)
+            return self._invalid(f"Value for meas must be IL, RL or IL&RL, instead it is {meas!r}")
 
-    def get_inpSPar(self):
-        return self.ask("INP:SPAR?")
-        
     def set_inpPol(self, pol):
         #1+2, 1, 2, 1&2 available on BOSA
         #PDL, MAX, MIN, SIMUL // INDEP, 1, 2, SIMuL on Component Analyzer (with/without x30)
-        if str(pol).upper() in ("1+2", "1", "2", "1&2", "PDL", "MAX", "MIN", "SIMUL", "INDEP"):
-            return self.ask("INP:POL " + str(pol).upper())
+        p = str(pol).upper()
+        if p in _POLS:
+            return self.ask(f"INP:POL {p}")
             
         else:
-            print("Value for pol must be 1+2, 1, 2, 1&2 for BOSA and PDL, MAX, MIN, SIMUL, INDEP, 1 or 2 for CA ")
+            return self._invalid("Value for pol must be 1+2, 1, 2, 1&2 for BOSA and PDL, MAX, MIN, SIMUL, INDEP, 1 or 2 for CA")
 
-    def get_inpPol(self):
-        return self.ask("INP:POL?")
-        
     def set_inpMueller(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("INP:POL:MUELL " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("INP:POL:MUELL 1")
-                
-            elif on == False:
-                return self.ask("INP:POL:MUELL 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        return self.ask(f"INP:POL:MUELL {_normalize_onoff(on)}")
 
-    def get_inpMueller(self):
-        return self.ask("INP:POL:MUELL?")
-        
-    def get_inpPow(self):
-        return self.ask("INP:POW?")
-        
 #   Calculate subsystem commands
 
     def mrk_disable(self):
         return self.ask("CALC:MARK:AOFF")
 
     def set_mrkState(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("CALC:MARK:STAT " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("CALC:MARK:STAT 1")
-                
-            elif on == False:
-                return self.ask("CALC:MARK:STAT 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        return self.ask(f"CALC:MARK:STAT {_normalize_onoff(on)}")
 
-    def get_mrkState(self):
-        return self.ask("CALC:MARK:STAT?")
-        
     def set_mrkMode(self, mode):
-        if str(mode).upper() in ("TRCK", "FIXX", "FIXY"):
-            return self.ask("CALC:MARK:MOD " + mode)
+        m = str(mode).upper()
+        if m in _MARK_MODES:
+            return self.ask(f"CALC:MARK:MOD {m}")
             
         else:
-            print("Value for mode must be TRCK, FIXX or FIXY, instead it is " + mode)
+            return self._invalid(f"Value for mode must be TRCK, FIXX or FIXY, instead it is {mode!r}")
 
-    def get_mrkState(self):
-        return self.ask("CALC:MARK:MOD?")
-        
     def mrk_max(self):
         return self.ask("CALC:MARK:MAX")
         
@@ -1194,178 +1353,56 @@ class BOSA23095:
         return self.ask("CALC:MARK:SCEN")
         
     def set_mrkX(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("CALC:MARK:X " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
+        return self.ask(f"CALC:MARK:X {value} {_norm_units(units, _UNITS_WAV)}")
 
-    def get_mrkX(self):
-        return self.ask("CALC:MARK:X?")
-           
     def set_mrkY(self, value, units):
-        if str(units or "").upper() in ("DBM", "MW", ""):
-            return self.ask("CALC:MARK:Y " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be DBM or MW, instead it is " + units)
+        return self.ask(f"CALC:MARK:Y {value} {_norm_units(units, _UNITS_POW)}")
 
-    def get_mrkY(self):
-        return self.ask("CALC:MARK:Y?")
-        
     def set_mrkThr(self, value, unit):
-        if str(unit or "").upper() in ("DB", ""):
-            return self.ask("CALC:MARK:THRE " + value + " " + str(unit or "").upper())
-            
-        else:
-            print("Value for unit must be DB, instead it is " + unit)
+        return self.ask(f"CALC:MARK:THRE {value} {_norm_units(unit, _UNITS_DB, 'unit')}")
 
-    def get_mrkThr(self):
-        return self.ask("CALC:MARK:THRE?")
-         
     def set_mrkRout(self, meas):
-        if str(meas).upper() in ("FREQ", "WAV"):
-            return self.ask("CALC:MARK:READ " + str(meas).upper())
+        m = str(meas).upper()
+        if m in _AXES:
+            return self.ask(f"CALC:MARK:READ {m}")
             
         else:
-            print("Value for meas must be FREQ or WAV, instead it is " + meas)
+            return self._invalid(f"Value for meas must be FREQ or WAV, instead it is {meas!r}")
 
-    def get_mrkRout(self):
-        return self.ask("CALC:MARK:READ?")
-           
     def mrk_SRefLev(self):
         return self.ask("CALC:MARK:SRL")
          
-    def get_mrkPol(self):
-        return self.ask("CALC:MARK:FUNC:DELT:POL")
-        
     def set_mrkDfun(self, on, state = False):
-        if state == True:
-            stat = ":STAT "
-        elif state == False:
-            stat = " "
-        else: 
-            print("Value for state must be boolean, instead it is " + state)
-            return
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("CALC:MARK:FUNC:DELT" + stat + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("CALC:MARK:FUNC:DELT" + stat + 1)
-                
-            elif on == False:
-                return self.ask("CALC:MARK:FUNC:DELT" + stat + 0)
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        stat = ":STAT " if _flag(state, "state") else " "
+        return self.ask(f"CALC:MARK:FUNC:DELT{stat}{_normalize_onoff(on)}")
 
     def get_mrkDfun(self, state = False):
-        if state == True:
-            stat = ":STAT "
-        elif state == False:
-            stat = " "
-        else: 
-            print("Value for state must be boolean, instead it is " + state)
-            return
-        return self.ask("CALC:MARK:FUNC:DELT" + stat + "?")
+        return self._hold_query("MARK:FUNC:DELT", state)
         
     def mrkD_Reset(self):
         return self.ask("CALC:MARK:FUNC:DELT:RES")
         
-    def get_mrkDXOff(self):
-        return self.ask("CALC:MARK:FUNC:DELT:X:OFFS?")
-         
-    def get_mrkDXRef(self):
-        return self.ask("CALC:MARK:FUNC:DELT:X:REF?")
-        
-    def get_mrkDYOff(self):
-        return self.ask("CALC:MARK:FUNC:DELT:Y:OFFS?")
-        
-    def get_mrkDYRef(self):
-        return self.ask("CALC:MARK:FUNC:DELT:Y:REF?")
-         
-    def get_mrkDPol(self):
-        return self.ask("CALC:MARK:FUNC:DELT:POL?")
-        
-    def get_mrkDAng(self):
-        return self.ask("CALC:MARK:FUNC:DELT:ANG?")
-    
     def set_maxHold(self, on, state):
-        if state == True:
-            stat = ":STAT "
-        elif state == False:
-            stat = " "
-        else: 
-            print("Value for state must be boolean, instead it is " + stat )
-            return
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("CALC:MAX" + stat + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("CALC:MAX" + stat + 1)
-                
-            elif on == False:
-                return self.ask("CALC:MAX" + stat + 0)
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        stat = ":STAT " if _flag(state, "state") else " "
+        return self.ask(f"CALC:MAX{stat}{_normalize_onoff(on)}")
 
     def get_maxHold(self, state):
-        if state == True:
-            stat = ":STAT "
-        elif state == False:
-            stat = " "
-        else: 
-            print("Value for state must be boolean, instead it is " + stat)
-            return
-        return self.ask("CALC:MAX" + stat)
+        return self._hold_query("MAX", state)
         
     def set_minHold(self, on, state):
-        if state == True:
-            stat = ":STAT "
-        elif state == False:
-            stat = " "
-        else: 
-            print("Value for state must be boolean, instead it is " + stat )
-            return
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("CALC:MIN" + stat + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("CALC:MIN" + stat + 1)
-                
-            elif on == False:
-                return self.ask("CALC:MIN" + stat + 0)
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        stat = ":STAT " if _flag(state, "state") else " "
+        return self.ask(f"CALC:MIN{stat}{_normalize_onoff(on)}")
 
-    def get_maxHold(self, state):
-        if state == True:
-            stat = ":STAT "
-        elif state == False:
-            stat = " "
-        else: 
-            print("Value for state must be boolean, instead it is " + stat)
-            return
-        return self.ask("CALC:MIN" + stat)
+    def get_minHold(self, state):
+        return self._hold_query("MIN", state)
+
+    def _hold_query(self, which, state):
+        """ CALC:<which>[:STAT] ? query of the delta marker function and the max/min hold """
+        stat = ":STAT " if _flag(state, "state") else " "
+        return self.ask(f"CALC:{which}{stat}?")
         
     def set_TPow(self, on):
-        if str(on).upper() in ("1", "0", "ON", "OFF"):
-            return self.ask("CALC:TPOW" + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("CALC:TPOW 1")
-                
-            elif on == False:
-                return self.ask("CALC:TPOW 0")
-                
-        else:
-            print("Value for on must be 1, 0, ON, OFF or a boolean, instead it is " + on)
+        return self.ask(f"CALC:TPOW {_normalize_onoff(on)}")
 
     def get_TPow(self, data):
         if data == True:
@@ -1373,90 +1410,42 @@ class BOSA23095:
         elif data == False:
             dat = "?"
         else: 
-            print("Value for data must be boolean, instead it is " + data)
-            return
-        return self.ask("CALC:TPOW" + dat)
+            return self._invalid(f"Value for data must be boolean, instead it is {data!r}")
+        return self.ask(f"CALC:TPOW{dat}")
         
     def set_TPowUp(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("CALC:TPOW:IRAN:UPP " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
+        return self.ask(f"CALC:TPOW:IRAN:UPP {value} {_norm_units(units, _UNITS_WAV)}")
 
-    def get_TPowUp(self):
-        return self.ask("CALC:TPOW:IRAN:UPP?")
-        
     def set_TPowLow(self, value, units):
-        if str(units or "").upper() in ("NM", "PM", "GHZ", "THZ", ""):
-            return self.ask("CALC:TPOW:IRAN:LOW " + value + " " + str(units or "").upper())
-            
-        else:
-            print("Value for units must be NM, PM, GHZ or THZ, instead it is " + units)
+        return self.ask(f"CALC:TPOW:IRAN:LOW {value} {_norm_units(units, _UNITS_WAV)}")
 
-    def set_TPowLow(self):
-        return self.ask("CALC:TPOW:IRAN:LOW?")
-        
-    def get_auxInPow(self):
-        return self.ask("CALC:AUXIN:POW?")
-        
     def set_OSNR(self, on):
-        if str(on).upper() in ("ON", "OFF"):
-            return self.ask("CALC:OSNR:STAT " + str(on).upper())
-            
-        elif isinstance(on, bool):
-            if on == True:
-                return self.ask("CALC:TPOW ON")
-                
-            elif on == False:
-                return self.ask("CALC:TPOW OFF")
-                
-        else:
-            print("Value for on must be ON or OFF or a boolean, instead it is " + on)
+        return self.ask(f"CALC:OSNR:STAT {_normalize_onoff(on)}")
 
-    def get_OSNR(self):
-        return self.ask("CALC:OSNR:STAT?")
-        
-    def get_OSNRval(self):
-        return self.ask("CALC:OSNR:VALUE?")
-        
     def set_OSNRdist(self, value):
-        return self.ask("CALC:OSNR:DIST " + value)
-        
-    def get_OSNRdist(self):
-        return self.ask("CALC:OSNR:DIST?")
+        return self.ask(f"CALC:OSNR:DIST {value}")
         
     def set_OSNRNmode(self, mode):
-        if str(mode).upper() in ("PEAK", "BW"):
-            return self.ask("CALC:OSNR:NOISEPOWMODE" + str(mode).upper())
+        m = str(mode).upper()
+        if m in _OSNR_MODES:
+            return self.ask(f"CALC:OSNR:NOISEPOWMODE {m}")
             
         else:
-            print("Value for mode must be Peak or BW, it is instead " + mode)
+            return self._invalid(f"Value for mode must be Peak or BW, it is instead {mode!r}")
 
-    def get_OSNRNmode(self):
-        return self.ask("CALC:OSNR:NOISEPOWMODE?")
-                
     def set_OSNRNrefBw(self, value):
-        return self.ask("CALC:OSNR:NOISEREFBW " + value)
-           
-    def get_OSNRNrefBW(self):
-        return self.ask("CALC:OSNR:NOISEREFBW?")
+        return self.ask(f"CALC:OSNR:NOISEREFBW {value}")
            
     def set_OSNRSmode(self, mode):
-        if str(mode).upper() in ("PEAK", "BW"):
-            return self.ask("CALC:OSNR:SIGNALPOWMODE" + str(mode).upper())
+        m = str(mode).upper()
+        if m in _OSNR_MODES:
+            return self.ask(f"CALC:OSNR:SIGNALPOWMODE {m}")
             
         else:
-            print("Value for mode must be Peak or BW, it is instead " + mode)
+            return self._invalid(f"Value for mode must be Peak or BW, it is instead {mode!r}")
 
-    def get_OSNRSmode(self):
-        return self.ask("CALC:OSNR:SIGNALPOWMODE?")
-    
     def set_OSNRSrefBw(self, value):
-        return self.ask("CALC:OSNR:SIGNALBW " + value)
-          
-    def get_OSNRSrefBW(self):
-        return self.ask("CALC:OSNR:SIGNALBW?")      
+        return self.ask(f"CALC:OSNR:SIGNALBW {value}")
     
 #   Trace subsystem commands
 
@@ -1466,9 +1455,12 @@ class BOSA23095:
         elif data == False:
             dat = ""
         else: 
-            print("Value for data must be boolean, instead it is " + data)
-            return
-        return self.ask("TRAC" + dat + ":COUNT?")
+            return self._invalid(f"Value for data must be boolean, instead it is {data!r}")
+        # the count only changes with the sweep range, cleared by the setters that change it
+        count = self._trcount_cache.get(dat)
+        if(count is None):
+            count = self._trcount_cache[dat] = self.ask(f"TRAC{dat}:COUNT?")
+        return count
          
     def get_trace(self, data = False):
         if data == True:
@@ -1476,9 +1468,8 @@ class BOSA23095:
         elif data == False:
             dat = "?"
         else: 
-            print("Value for data must be boolean, instead it is " + data)
-            return
-        return self.ask("TRAC" + dat)
+            return self._invalid(f"Value for data must be boolean, instead it is {data!r}")
+        return self.ask(f"TRAC{dat}")
     
     def get_trMaxX(self, data = False):
         if data == True:
@@ -1486,9 +1477,8 @@ class BOSA23095:
         elif data == False:
             dat = ""
         else: 
-            print("Value for data must be boolean, instead it is " + data)
-            return
-        return self.ask("TRAC" + dat + ":MAX:X?")
+            return self._invalid(f"Value for data must be boolean, instead it is {data!r}")
+        return self.ask(f"TRAC{dat}:MAX:X?")
     
     def get_trMaxY(self, data = False):
         if data == True:
@@ -1496,9 +1486,8 @@ class BOSA23095:
         elif data == False:
             dat = ""
         else: 
-            print("Value for data must be boolean, instead it is " + data)
-            return
-        return self.ask("TRAC" + dat + ":MAX:Y?")
+            return self._invalid(f"Value for data must be boolean, instead it is {data!r}")
+        return self.ask(f"TRAC{dat}:MAX:Y?")
 
 #   Format subsystem commands
 
@@ -1508,19 +1497,18 @@ class BOSA23095:
         elif data == False:
             dat = ""
         else: 
-            print("Value for data must be boolean, instead it is " + data)
-            return
+            return self._invalid(f"Value for data must be boolean, instead it is {data!r}")
         if str(format).upper() == "ASCII":
+            self._format = "ASCII"
             if length != -1:
-                return self.ask("FORM" + dat + " ASCII," + int(length))
+                return self.ask(f"FORM{dat} ASCII,{int(length)}")
             else:
-                return self.ask("FORM" + dat + " ASCII")
+                return self.ask(f"FORM{dat} ASCII")
         elif str(format).upper() == "REAL":
-            return self.ask("FORM" + dat + " REAL")
+            self._format = "REAL"
+            return self.ask(f"FORM{dat} REAL")
         else:
-            print("Value for format must be ASCII or REAL, instead it is " + format)
-
-        return self.ask("FORM" + dat)
+            return self._invalid(f"Value for format must be ASCII or REAL, instead it is {format!r}")
 
     def get_format(self, data = False):
         if data == True:
@@ -1528,35 +1516,62 @@ class BOSA23095:
         elif data == False:
             dat = "?"
         else: 
-            print("Value for data must be boolean, instead it is " + data)
-            return
-        return self.ask("FORM" + dat)
+            return self._invalid(f"Value for data must be boolean, instead it is {data!r}")
+        return self.ask(f"FORM{dat}")
+
+    @contextlib.contextmanager
+    def format(self, fmt):
+
+        """ switch to FORM fmt for the block and go back to the previous format on exit
+
+            Nothing is sent when the instrument is already in fmt.
+
+                with bosa.format("ASCII"):
+                    n = int(bosa.get_trcount())
+
+        """
+
+        fmt = str(fmt).upper()
+
+        previous = self._format
+
+        if(fmt != previous):
+
+            self.set_format(fmt)
+
+        try:
+
+            yield
+
+        finally:
+
+            if(previous is not None and previous != self._format):
+
+                self.set_format(previous)
 
 #   MMemory subsystem commands
 
     def store_tr(self, name, ftype, ink):
-        if str(ftype).upper() not in ("BDF", "TXT", "CSV", "JPG", "BMP", "GIF", "TIF"):
-            print("Value for ftype must be bdf, txt, csv, jpg, bmp, gif or tif, instead it is " + ftype)
-            return
+        if str(ftype).upper() not in _FTYPES:
+            return self._invalid(f"Value for ftype must be bdf, txt, csv, jpg, bmp, gif or tif, instead it is {ftype!r}")
         else:
-            if str(ink).upper() in ("1", "0", "ON", "OFF"):
-                return self.ask("MMEM:STOR:TRAC " + name + "." + ftype + ", " + str(ink).upper())
-                
-            elif isinstance(ink, bool):
-                if ink == True:
-                    return self.ask("MMEM:STOR:TRAC " + name + "." + ftype + ", 1")
-                elif ink == False:
-                    return self.ask("MMEM:STOR:TRAC " + name + "." + ftype + ", 0")
-            else:
-                print("Value for ink must be 1, 0, ON, OFF or a boolean, instead it is " + ink)
-                return
+            return self.ask(f"MMEM:STOR:TRAC {name}.{ftype}, {_normalize_onoff(ink, 'ink')}")
 
     def del_tr(self, name):
-        return self.ask("MMEM:DEL:TRAC " + name)
+        return self.ask(f"MMEM:DEL:TRAC {name}")
     
     def load_tr(self, trace, name):
-        if str(trace).upper() not in ("M1", "M2", "M3", "M4"):
-            print("Value for trace must be M1 to M4, it is instead " + trace)
-            return
+        if str(trace).upper() not in _MEM_TRACES:
+            return self._invalid(f"Value for trace must be M1 to M4, it is instead {trace!r}")
         else:
-            return self.ask("MMEM:LOAD:TRAC " + trace + "," + name)
\ No newline at end of file
+            return self.ask(f"MMEM:LOAD:TRAC {trace},{name}")
+
+for name, query in _GETTERS:
+
+    setattr(BOSA23095, name, _getter(name, query))
+
+for name, header, resizes in _WAV_FIELDS:
+
+    setattr(BOSA23095, "get_" + name, _getter("get_" + name, "SENS:WAV:" + header + "?"))
+
+    setattr(BOSA23095, "set_" + name, _wav_setter(name, header, resizes))
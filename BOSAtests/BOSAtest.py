@@ -3,35 +3,34 @@
 ### Imports and initial setup
 
 import numpy as np
+import matplotlib
+matplotlib.use("Agg") # files only, no GUI canvas
 import matplotlib.pyplot as plt
 import time 
-import pandas as pd
 
 from BOSA import BOSA23095
-from T3PS43203P import T3PS43203P
 
 #    rm = visa.ResourceManager()
 #    rm.list_resources()
 #    print(rm.list_resources())
 
-def checkvar(msg, slptime, checkv, checkf, *args):
-    checkv = checkf(*args)
-    # time.sleep(slptime)
-    while(checkv != str(msg + "\r\n")):
+def wait_for(checkf, expected, *args, initial=0.1, max_interval=5, timeout=300):
+    # poll checkf(*args) until it answers expected, backing off from initial up to max_interval seconds
+    expected = expected.strip()
+    deadline = time.monotonic() + timeout
+    delay = initial
+    checkv = checkf(*args).strip()
+    while(checkv != expected):
         print(checkv)
-        checkv = checkf(*args)
-        time.sleep(slptime)
-
-def flatten(iterable):
-    if isinstance(iterable, tuple):
-        for x in iterable:
-            if isinstance(x, tuple):
-                yield from flatten(x)
-            else:
-                yield x
-    
+        if time.monotonic() > deadline:
+            raise TimeoutError("no " + expected + " from " + checkf.__name__ + " after " + str(timeout) + " s")
+        time.sleep(delay)
+        delay = min(delay * 2, max_interval)
+        checkv = checkf(*args).strip()
+
 ### Power supply initializing
         
+# from T3PS43203P import T3PS43203P
 # # v_source = T3PS43203P(name=('TCPIP0::169.254.211.244::1026::SOCKET'))
 # channel = 4
 # voltages = np.linspace(0,5,6)
@@ -41,9 +40,6 @@ def flatten(iterable):
 
 IP= "10.10.68.64"
 #    address = 'GPIB0::4::INSTR'
-mode = ""
-is_running = ""
-laser = ""
 laser_flag = False
 
 BOSA400c = BOSA23095("LAN", IP)
@@ -52,7 +48,7 @@ if BOSA400c.get_mode()=="MAIN":
     laser_flag = True
 BOSA400c.set_mode("CA")
 
-checkvar("CA",5,mode,BOSA400c.get_mode)
+wait_for(BOSA400c.get_mode, "CA", max_interval=5)
 # time.sleep(5)
 # mode = BOSA400c.get_mode()
 # while(mode != "CA\r\n"):
@@ -63,7 +59,7 @@ checkvar("CA",5,mode,BOSA400c.get_mode)
 
 BOSA400c.set_state("RUN", 1)
 
-checkvar("ON",20,is_running,BOSA400c.get_state,"RUN")
+wait_for(BOSA400c.get_state, "ON", "RUN", max_interval=20)
 # time.sleep(5)
 # is_running = BOSA400c.get_state("RUN")
 # while(is_running!="ON\r\n"):
@@ -71,7 +67,7 @@ checkvar("ON",20,is_running,BOSA400c.get_state,"RUN")
 #     is_running = BOSA400c.get_state("RUN")
 #     time.sleep(5)
 
-# checkvar("OK",5,laser,BOSA400c.get_laser)
+# wait_for(BOSA400c.get_laser, "OK", max_interval=5)
 # time.sleep(5)
 # laser = BOSA400c.get_laser()
 # while(laser!="OK\r\n"):
@@ -88,40 +84,32 @@ if laser_flag==True:
     
 t = time.time()
 
-BOSA400c.set_format("ASCII")
 print(BOSA400c.get_mode()+"1")
 BOSA400c.set_wavSpan("40","nm")
 BOSA400c.set_normY(0)
 BOSA400c.autoscaleY()
 
-NumPoints=int(BOSA400c.get_trcount())
-
-BOSA400c.set_format("REAL")
+with BOSA400c.format("ASCII"):
+    NumPoints=int(BOSA400c.get_trcount())
 
-
-Trace = BOSA400c.ask_TRACE_REAL('LAN',NumPoints)
+arr = BOSA400c.get_trace_binary(NumPoints) # one row per point: nm, dB
 
 
 ### CLose and save graph
 
-x_axis, y_axis = zip(*Trace)
-x_axis = tuple(flatten(x_axis))
-y_axis = tuple(flatten(y_axis))
 elapsed = time.time() - t
 rootfile = "C:/BOSA/data/"
 svfile = input("Input file to save: ")
 svfile = str(rootfile + svfile)
 
-BOSA400c.set_format("ASCII")
-
-plt.plot(x_axis,y_axis)
+plt.plot(arr[:,0], arr[:,1])
 plt.xlabel(str(BOSA400c.get_unitsX()))
 plt.ylabel("dB")
 
 print(str(elapsed) +  " seconds elapsed")
 
-df = pd.DataFrame(zip(x_axis, y_axis), columns=['nm', 'dB'])
-df.to_csv(svfile + ".csv", index = False, sep = ";")
+# 15 significant digits, far beyond the instrument precision (%.6g would round wavelengths to 10 pm)
+np.savetxt(svfile + ".csv", arr, fmt = "%.15g", delimiter = ";", header = "nm;dB", comments = "")
 plt.savefig(svfile)
 plt.close()
 
@@ -129,7 +117,7 @@ plt.close()
 
 # BOSA400c.set_state("RUN", 0)
 
-# checkvar("OFF",5,is_running,BOSA400c.get_state,"RUN")
+# wait_for(BOSA400c.get_state, "OFF", "RUN", max_interval=5)
 # time.sleep(5)
 # is_running = BOSA400c.get_state("RUN")
 # while(is_running!="OFF(\r\n"):
@@ -3,9 +3,11 @@
 ### Imports and initial setup
 
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use("Agg") # files only, no GUI canvas
+from matplotlib.figure import Figure
 import time 
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
 from BOSA import BOSA23095
 from T3PS43203P import T3PS43203P
@@ -14,22 +16,34 @@ from T3PS43203P import T3PS43203P
 #    rm.list_resources()
 #    print(rm.list_resources())
 
-def checkvar(msg, slptime, checkv, checkf, *args):
-    checkv = checkf(*args)
-    # time.sleep(slptime)
-    while(checkv != str(msg + "\r\n")):
+def wait_for(checkf, expected, *args, initial=0.1, max_interval=5, timeout=300):
+    # poll checkf(*args) until it answers expected, backing off from initial up to max_interval seconds
+    expected = expected.strip()
+    deadline = time.monotonic() + timeout
+    delay = initial
+    checkv = checkf(*args).strip()
+    while(checkv != expected):
         print(checkv)
-        checkv = checkf(*args)
-        time.sleep(slptime)
-
-def flatten(iterable):
-    if isinstance(iterable, tuple):
-        for x in iterable:
-            if isinstance(x, tuple):
-                yield from flatten(x)
-            else:
-                yield x
-    
+        if time.monotonic() > deadline:
+            raise TimeoutError("no " + expected + " from " + checkf.__name__ + " after " + str(timeout) + " s")
+        time.sleep(delay)
+        delay = min(delay * 2, max_interval)
+        checkv = checkf(*args).strip()
+
+# one Figure redrawn for every trace; the OO API, pyplot keeps global state and is not thread safe
+fig = Figure()
+ax = fig.add_subplot()
+
+def save(arr, svfile):
+    # png and csv of one trace, runs on the save pool while the next trace is acquired
+    ax.clear()
+    ax.plot(arr[:,0], arr[:,1])
+    ax.set_xlabel("nm")
+    ax.set_ylabel("dB")
+    fig.savefig(svfile + ".png")
+
+    np.savetxt(svfile + ".csv", arr, fmt = "%.15g", delimiter = ";", header = "nm;dB", comments = "")
+
 ### Power supply initializing
         
 v_source = T3PS43203P(name=('TCPIP0::169.254.211.244::1026::SOCKET'))
@@ -41,9 +55,6 @@ voltages = np.linspace(0,5,6)
 
 IP= "10.10.68.64"
 #    address = 'GPIB0::4::INSTR'
-mode = ""
-is_running = ""
-laser = ""
 laser_flag = False
 rootfile = "C:/BOSA/data/V1550PA/"
 
@@ -53,7 +64,7 @@ if BOSA400c.get_mode()=="MAIN":
     laser_flag = True
 BOSA400c.set_mode("CA")
 
-checkvar("CA",5,mode,BOSA400c.get_mode)
+wait_for(BOSA400c.get_mode, "CA", max_interval=5)
 # time.sleep(5)
 # mode = BOSA400c.get_mode()
 # while(mode != "CA\r\n"):
@@ -64,7 +75,7 @@ checkvar("CA",5,mode,BOSA400c.get_mode)
 
 BOSA400c.set_state("RUN", 1)
 
-checkvar("ON",20,is_running,BOSA400c.get_state,"RUN")
+wait_for(BOSA400c.get_state, "ON", "RUN", max_interval=20)
 # time.sleep(5)
 # is_running = BOSA400c.get_state("RUN")
 # while(is_running!="ON\r\n"):
@@ -72,7 +83,7 @@ checkvar("ON",20,is_running,BOSA400c.get_state,"RUN")
 #     is_running = BOSA400c.get_state("RUN")
 #     time.sleep(5)
 
-# checkvar("OK",5,laser,BOSA400c.get_laser)
+# wait_for(BOSA400c.get_laser, "OK", max_interval=5)
 # time.sleep(5)
 # laser = BOSA400c.get_laser()
 # while(laser!="OK\r\n"):
@@ -85,8 +96,20 @@ if laser_flag==True:
     laser_flag = False
 
 
+# traces are read in binary, the instrument stays in FORM REAL for the whole run
+BOSA400c.set_wavSpan("40","nm")
+BOSA400c.set_format("REAL")
+
+# the span is fixed for the whole run, so is the number of points
+with BOSA400c.format("ASCII"):
+    NumPoints=int(BOSA400c.get_trcount())
+
+
 ### Start test
     
+pool = ThreadPoolExecutor(max_workers=1) # a single worker, saves share fig
+saves = []
+
 t = time.time()
 
 for v in voltages:
@@ -94,38 +117,24 @@ for v in voltages:
     v_source.set_voltage(channel = channel, value = v)
     time.sleep(1)
 
-    BOSA400c.set_format("ASCII")
     print(BOSA400c.get_mode()+"1")
-    BOSA400c.set_wavSpan("40","nm")
     BOSA400c.set_normY(0)
     BOSA400c.autoscaleY()
 
-    NumPoints=int(BOSA400c.get_trcount())
-
-    BOSA400c.set_format("REAL")
-
-
-    Trace = BOSA400c.ask_TRACE_REAL('LAN',NumPoints)
+    # one row per point: nm, dB; read straight into a new array, which the save pool keeps
+    arr = BOSA400c.get_trace_binary(NumPoints, out = np.empty((NumPoints, 2)))
 
 
     ### CLose and save graph
 
-    x_axis, y_axis = zip(*Trace)
-    x_axis = tuple(flatten(x_axis))
-    y_axis = tuple(flatten(y_axis))
     svfile = str(rootfile + "BOSAtestVOA" + str(int(v)) + "V")
 
-    BOSA400c.set_format("ASCII")
-
-    plt.plot(x_axis,y_axis)
-    plt.xlabel("nm")
-    plt.ylabel("dB")
+    saves.append(pool.submit(save, arr, svfile))
 
-    df = pd.DataFrame(zip(x_axis, y_axis), columns=['nm', 'dB'])
-    df.to_csv(svfile + ".csv", index = False, sep = ";")
-    plt.savefig(svfile + ".png")
-    plt.close()
 
+pool.shutdown(wait=True)
+for s in saves:
+    s.result() # re-raise any error from the save pool
 
 elapsed = time.time() - t
 print(str(elapsed) +  " seconds elapsed")
@@ -133,7 +142,7 @@ print(str(elapsed) +  " seconds elapsed")
 
 # BOSA400c.set_state("RUN", 0)
 
-# checkvar("OFF",5,is_running,BOSA400c.get_state,"RUN")
+# wait_for(BOSA400c.get_state, "OFF", "RUN", max_interval=5)
 # time.sleep(5)
 # is_running = BOSA400c.get_state("RUN")
 # while(is_running!="OFF(\r\n"):